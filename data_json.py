@@ -14,8 +14,14 @@ Exports AEW tracks (1979–2023) → interactive GeoJSON with:
 import xarray as xr
 import numpy as np
 import pandas as pd
-import json
+import msgspec
 import os
+import gzip
+import pickle
+import shutil
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import Optional
 
 # ----------------------------------------------------------------------
 # Configuration
@@ -28,162 +34,379 @@ OUTPUT_DIR = "output"
 # Output options
 COMBINED_OUTPUT = f"{OUTPUT_DIR}/aew_tracks_1979_2023_interactive.json"
 PER_YEAR_OUTPUT = True  # Set to False if you only want the big combined file
+GZIP_COMBINED = True  # Also write a gzipped copy of the (minified) combined file
+COMBINED_GZ_OUTPUT = f"{COMBINED_OUTPUT}.gz"
+COMBINED_NAME = "African Easterly Wave Tracks 1979–2023 (with TC Genesis)"
+
+# Tidy per-point table partitioned by year, so GeoJSON can be rebuilt without
+# re-reading the NetCDF files (see parquet_to_geojson.py)
+PARQUET_OUTPUT = True
+PARQUET_DIR = f"{OUTPUT_DIR}/parquet"
+PARQUET_TMP_DIR = f"{PARQUET_DIR}.tmp"  # workers write here; swapped in by main()
+
+# Cache of cleaned per-year arrays, invalidated when the NetCDF file changes
+CACHE_DIR = f"{OUTPUT_DIR}/.cache"
+USE_CACHE = True  # Set to False to always re-read the NetCDF files
+CACHE_VERSION = 3  # Bump when the layout returned by _load_clean changes
+
+# Per-year files are pretty-printed for inspection; the combined file is
+# minified since it is only ever fetched by the browser.
+JSON_INDENT = 2
+
+CRS84 = {"type": "name", "properties": {"name": "urn:ogc:def:crs:OGC:1.3:CRS84"}}
 
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
 # ----------------------------------------------------------------------
-# Helper: process a single year's file
+# GeoJSON schema (msgspec encodes straight from struct fields, in this order)
 # ----------------------------------------------------------------------
 
 
-def process_year(year):
+class PointData(msgspec.Struct):
+    strength: float
+    month: int
+    time: str
+
+
+class Properties(msgspec.Struct):
+    system_id: int
+    year: int
+    track_length_points: int
+    months: list[int]
+    strength_min: float
+    strength_max: float
+    strength_mean: float
+    point_data: list[PointData]
+
+    # NEW: Tropical Cyclone info
+    developed_into_tc: bool
+    tc_name: Optional[str]
+    tc_genesis_time: Optional[str]
+
+
+class LineString(msgspec.Struct, kw_only=True):
+    type: str = "LineString"
+    coordinates: list[list[float]]
+
+
+class Feature(msgspec.Struct, kw_only=True):
+    type: str = "Feature"
+    geometry: LineString
+    properties: Properties
+
+
+class FeatureCollection(msgspec.Struct, kw_only=True):
+    type: str = "FeatureCollection"
+    name: str
+    crs: dict = msgspec.field(default_factory=lambda: CRS84)
+    features: list[Feature] = []
+
+
+encoder = msgspec.json.Encoder()
+
+# ----------------------------------------------------------------------
+# Helper: load and clean a single year's file (cached on disk)
+# ----------------------------------------------------------------------
+
+
+def _load_clean(year):
+    """Read one year's NetCDF file and return its cleaned arrays as a dict.
+
+    The result is pickled under ``CACHE_DIR`` keyed on the source file's size
+    and mtime, so reruns skip NetCDF decoding until the input changes.
+    Returns None if the file is missing.
+    """
     netcdf_file = f"{DATA_DIR}/AEW_tracks_post_processed_year_{year}.nc"
     if not os.path.exists(netcdf_file):
         print(f"Warning: Missing {netcdf_file} → skipping {year}")
-        return None, year
+        return None
+
+    st = os.stat(netcdf_file)
+    key = (CACHE_VERSION, st.st_size, st.st_mtime_ns)
+    cache_file = f"{CACHE_DIR}/aew_clean_{year}.pkl"
+    if USE_CACHE and os.path.exists(cache_file):
+        # Any unreadable cache (damaged file, pickle from other library
+        # versions) is just a miss; the cache must never break a run
+        try:
+            with open(cache_file, "rb") as f:
+                cached = pickle.load(f)
+            hit = cached["key"] == key
+        except Exception:
+            hit = False
+        if hit:
+            print(f"Loading {netcdf_file} (cached) ...")
+            return cached["data"]
 
     print(f"Loading {netcdf_file} ...")
     ds = xr.open_dataset(netcdf_file)
 
-    # Remove duplicate times (safety)
-    if ds.time.to_index().duplicated().any():
-        _, idx = np.unique(ds.time.values, return_index=True)
-        ds = ds.isel(time=idx).sortby('time')
+    # Remove duplicate times (safety). np.unique's indices already follow
+    # sorted time order, so no sortby is needed; clean files skip the isel
+    _, idx = np.unique(ds.time.values, return_index=True)
+    if len(idx) != ds.sizes['time']:
+        ds = ds.isel(time=idx)
+
+    # Format the shared time axis once per year instead of once per track
+    t_raw = ds.time.values
+    times_all = np.char.replace(
+        np.datetime_as_string(t_raw.astype('datetime64[m]'), unit='m'), 'T', ' ')
+    months_all = (t_raw.astype('datetime64[M]').astype(int) % 12 + 1).astype(np.int8)
+
+    # Read each (system, time) field once as a plain numpy matrix; the
+    # transpose pins the row order so tracks can be sliced by integer index
+    lon_np = ds.AEW_lon_smooth.transpose('system', 'time').values
+    lat_np = ds.AEW_lat_smooth.transpose('system', 'time').values
+    str_np = ds.AEW_strength.transpose('system', 'time').values
+
+    # One fused NaN scan over the whole year, then each track's valid time
+    # indices, so the per-system loop never re-scans for NaNs
+    valid_mat = ~(np.isnan(lon_np) | np.isnan(lat_np) | np.isnan(str_np))
+    nonzero_per_sys = [np.flatnonzero(row) for row in valid_mat]
+
+    data = {
+        "sys_ids": ds.system.values,
+        "times_all": times_all,
+        "months_all": months_all,
+        "lon": lon_np,
+        "lat": lat_np,
+        "strength": str_np,
+        "valid_idx": nonzero_per_sys,
+        "tc_names": ds.TC_name.values,
+        "tc_gen_times": ds.TC_gen_time.values,
+    }
+    ds.close()
+
+    if USE_CACHE:
+        # Write to a temp file first so an interrupted run never leaves a
+        # truncated pickle behind
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp_file = f"{cache_file}.tmp"
+        with open(tmp_file, "wb") as f:
+            pickle.dump({"key": key, "data": data}, f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, cache_file)
+
+    return data
+
 
-    # Add month as coordinate
-    time_pd = pd.to_datetime(ds.time.values)
-    ds = ds.assign_coords(month=('time', time_pd.month))
+def _write_bytes(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
 
-    lon = ds.AEW_lon_smooth
-    lat = ds.AEW_lat_smooth
-    strength = ds.AEW_strength
+
+# ----------------------------------------------------------------------
+# Helper: process a single year's file
+# ----------------------------------------------------------------------
+
+
+def process_year(year):
+    """Build one year's features and return them as an encoded shard.
+
+    Returns ``(shard, n_tracks, n_tc, year)`` where ``shard`` is the
+    JSON-encoded feature list without its surrounding brackets, ready to be
+    spliced into the combined FeatureCollection.
+    """
+    data = _load_clean(year)
+    if data is None:
+        return None, 0, 0, year
+
+    sys_ids = data["sys_ids"]
+    times_all = data["times_all"]
+    months_all = data["months_all"]
+    tc_names = data["tc_names"]
+    tc_gen_times = data["tc_gen_times"]
+    lon_np = data["lon"]
+    lat_np = data["lat"]
+    str_np = data["strength"]
+
+    # ──────────────────────────────
+    # TC Genesis Information (all systems at once)
+    # ──────────────────────────────
+    # Handle genesis time: one isna mask and one strftime call per year
+    has_tc = ~pd.isna(tc_gen_times)
+    tc_genesis_strs = np.full(len(sys_ids), None, dtype=object)
+    tc_genesis_strs[has_tc] = pd.to_datetime(
+        tc_gen_times[has_tc]).strftime('%Y-%m-%d %H:%M')
+
+    # Clean TC name (remove padding, handle missing/unnamed)
+    tc_names_clean = np.char.strip(tc_names.astype(str)).astype(object)
+    tc_names_clean[(tc_names_clean == '') | (tc_names_clean == 'nan')
+                   | pd.isna(tc_names)] = None
 
     features = []
-    for sys in ds.system.values:
-        # Extract track data
-        x = lon.sel(system=sys).values
-        y = lat.sel(system=sys).values
-        s = strength.sel(system=sys).values
-        t = ds.time.values
-
-        # Mask invalid points
-        valid = ~(np.isnan(x) | np.isnan(y) | np.isnan(s))
-        if not valid.any():
+    for i, (sys, valid_idx) in enumerate(zip(sys_ids, data["valid_idx"])):
+        if not valid_idx.size:
             continue
 
-        x, y, s, t = x[valid], y[valid], s[valid], t[valid]
-
-        coordinates = [[float(lon_val), float(lat_val)]
-                       for lon_val, lat_val in zip(x, y)]
-        times_str = pd.to_datetime(t).strftime('%Y-%m-%d %H:%M').tolist()
-        months = pd.to_datetime(t).month.tolist()
+        # Extract track data (valid points only)
+        x = lon_np[i, valid_idx]
+        y = lat_np[i, valid_idx]
+        s = str_np[i, valid_idx]
+        months = months_all[valid_idx]
+        times_str = times_all[valid_idx]
 
+        # tolist() converts to native Python scalars in one C pass
+        coordinates = np.stack([x.astype(np.float64, copy=False),
+                                y.astype(np.float64, copy=False)], axis=1).tolist()
         point_data = [
-            {"strength": float(val), "month": int(mo), "time": tm}
-            for val, mo, tm in zip(s, months, times_str)
+            PointData(val, mo, tm)
+            for val, mo, tm in zip(s.tolist(), months.tolist(), times_str.tolist())
         ]
 
-        # ──────────────────────────────
-        # TC Genesis Information
-        # ──────────────────────────────
-        tc_name_raw = ds.TC_name.sel(system=sys).values
-        tc_gen_time_raw = ds.TC_gen_time.sel(system=sys).values
-
-        # Clean TC name (remove padding, handle missing/unnamed)
-        tc_name = str(tc_name_raw).strip()
-        if tc_name == '' or tc_name == 'nan' or pd.isna(tc_name_raw):
-            tc_name = None
-
-        # Handle genesis time
-        if pd.isna(tc_gen_time_raw):
-            developed_into_tc = False
-            tc_genesis_time = None
-        else:
-            tc_gen_dt = pd.to_datetime(tc_gen_time_raw)
-            tc_genesis_time = tc_gen_dt.strftime('%Y-%m-%d %H:%M')
-            developed_into_tc = True
-
         # ──────────────────────────────
         # Build Feature
         # ──────────────────────────────
-        feature = {
-            "type": "Feature",
-            "geometry": {
-                "type": "LineString",
-                "coordinates": coordinates
-            },
-            "properties": {
-                "system_id": int(sys.values) if hasattr(sys, 'values') else int(sys),
-                "year": int(year),
-                "track_length_points": len(coordinates),
-                "months": list(set(months)),
-                "strength_min": float(s.min()),
-                "strength_max": float(s.max()),
-                "strength_mean": float(s.mean()),
-                "point_data": point_data,
-
-                # NEW: Tropical Cyclone info
-                "developed_into_tc": developed_into_tc,
-                "tc_name": tc_name,
-                "tc_genesis_time": tc_genesis_time,
-            }
-        }
+        feature = Feature(
+            geometry=LineString(coordinates=coordinates),
+            properties=Properties(
+                system_id=int(sys.values) if hasattr(sys, 'values') else int(sys),
+                year=int(year),
+                track_length_points=len(coordinates),
+                months=np.unique(months).tolist(),
+                strength_min=float(s.min()),
+                strength_max=float(s.max()),
+                strength_mean=float(s.mean()),
+                point_data=point_data,
+                developed_into_tc=bool(has_tc[i]),
+                tc_name=tc_names_clean[i],
+                tc_genesis_time=tc_genesis_strs[i],
+            ),
+        )
         features.append(feature)
 
     print(f"  → {len(features)} tracks from {year} (including TC precursors)")
-    return features, year
 
+    if not features:
+        return None, 0, 0, year
 
-# ----------------------------------------------------------------------
-# Main: loop over all years
-# ----------------------------------------------------------------------
-all_features = []
+    # Optional: save per-year GeoJSON / Parquet on a writer thread, so the
+    # disk writes overlap with encoding this year's shard for the combined file
+    pending = []
+    with ThreadPoolExecutor(max_workers=1) as writer:
+        if PER_YEAR_OUTPUT:
+            per_year_json = f"{OUTPUT_DIR}/aew_tracks_{year}_interactive.json"
+            geojson_year = FeatureCollection(
+                name=f"African Easterly Wave Tracks {year}",
+                features=features,
+            )
+            pending.append(writer.submit(
+                _write_bytes, per_year_json,
+                msgspec.json.format(encoder.encode(geojson_year), indent=JSON_INDENT)))
 
-for year in range(START_YEAR, END_YEAR + 1):
-    features, yr = process_year(year)
-    if features:
-        all_features.extend(features)
+        if PARQUET_OUTPUT:
+            # Imported here so pyarrow is only needed when Parquet is enabled
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            # One row per valid (system, time) point; the year comes from the
+            # hive-style partition directory
+            valid_idx = data["valid_idx"]
+            rows = np.repeat(np.arange(len(sys_ids)), [len(v) for v in valid_idx])
+            cols = np.concatenate(valid_idx)
+            table = pa.table({
+                "sys_id": sys_ids[rows].astype(np.int32),
+                "time": times_all[cols],
+                "lon": lon_np[rows, cols],
+                "lat": lat_np[rows, cols],
+                "strength": str_np[rows, cols],
+                "month": months_all[cols],
+                "tc_name": pa.array(tc_names_clean[rows], type=pa.string()),
+                "tc_gen_time": pa.array(tc_genesis_strs[rows], type=pa.string()),
+            })
+            part_dir = f"{PARQUET_TMP_DIR}/year={year}"
+            os.makedirs(part_dir, exist_ok=True)
+            pending.append(writer.submit(pq.write_table, table, f"{part_dir}/part.parquet"))
+
+        shard = encoder.encode(features)[1:-1]
+        n_tc = sum(1 for f in features if f.properties.developed_into_tc)
+
+    for fut in pending:
+        fut.result()  # re-raise any write error from the thread
+    if PER_YEAR_OUTPUT:
+        print(f"  Saved {per_year_json}")
+
+    return shard, len(features), n_tc, year
 
-        # Optional: save per-year GeoJSON
-        if PER_YEAR_OUTPUT:
-            per_year_json = f"{OUTPUT_DIR}/aew_tracks_{yr}_interactive.json"
-            geojson_year = {
-                "type": "FeatureCollection",
-                "name": f"African Easterly Wave Tracks {yr}",
-                "crs": {"type": "name", "properties": {"name": "urn:ogc:def:crs:OGC:1.3:CRS84"}},
-                "features": features
-            }
-            with open(per_year_json, "w", encoding="utf-8") as f:
-                json.dump(geojson_year, f, indent=2)
-            print(f"  Saved {per_year_json}")
 
 # ----------------------------------------------------------------------
-# Save combined 1979–2023 file
+# Main: process all years in parallel (each year is independent)
 # ----------------------------------------------------------------------
-if all_features:
-    geojson_combined = {
+def main():
+    # Stream the combined FeatureCollection: write the framing once and splice
+    # in each year's pre-encoded features, so no year-spanning list is built
+    header = encoder.encode({
         "type": "FeatureCollection",
-        "name": "African Easterly Wave Tracks 1979–2023 (with TC Genesis)",
-        "crs": {"type": "name", "properties": {"name": "urn:ogc:def:crs:OGC:1.3:CRS84"}},
-        "features": all_features
-    }
+        "name": COMBINED_NAME,
+        "crs": CRS84,
+    })
+    n_tracks = 0
+    tc_count = 0
+
+    # Stream into temp files and only promote them once every year succeeded
+    # and produced tracks, so a failed or empty run keeps the previous files.
+    # The Parquet partitions are staged the same way, so years that are now
+    # missing or empty never linger in PARQUET_DIR.
+    tmp_output = f"{COMBINED_OUTPUT}.tmp"
+    tmp_gz_output = f"{COMBINED_GZ_OUTPUT}.tmp"
+    shutil.rmtree(PARQUET_TMP_DIR, ignore_errors=True)
+    try:
+        with ProcessPoolExecutor(max_workers=os.cpu_count()) as ex, \
+                open(tmp_output, "wb") as out, \
+                (gzip.open(tmp_gz_output, "wb", compresslevel=6)
+                 if GZIP_COMBINED else nullcontext()) as gz:
+            sinks = [f for f in (out, gz) if f is not None]
+
+            def write(chunk):
+                for f in sinks:
+                    f.write(chunk)
+
+            write(header[:-1] + b',"features":[')
+            # map() yields in submission order, so the combined file stays sorted by year
+            for shard, n, n_tc, _ in ex.map(process_year, range(START_YEAR, END_YEAR + 1)):
+                if not shard:
+                    continue
+                if n_tracks:
+                    write(b",")
+                write(shard)
+                n_tracks += n
+                tc_count += n_tc
+            write(b"]}")
 
-    with open(COMBINED_OUTPUT, "w", encoding="utf-8") as f:
-        json.dump(geojson_combined, f, indent=2)
+        if n_tracks:
+            os.replace(tmp_output, COMBINED_OUTPUT)
+            if GZIP_COMBINED:
+                os.replace(tmp_gz_output, COMBINED_GZ_OUTPUT)
+            if PARQUET_OUTPUT:
+                shutil.rmtree(PARQUET_DIR, ignore_errors=True)
+                os.replace(PARQUET_TMP_DIR, PARQUET_DIR)
+    finally:
+        for tmp_file in (tmp_output, tmp_gz_output):
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+        shutil.rmtree(PARQUET_TMP_DIR, ignore_errors=True)
 
+    # ------------------------------------------------------------------
     # Summary
-    tc_count = sum(
-        1 for f in all_features if f["properties"]["developed_into_tc"])
-    print("\n" + "="*70)
-    print(f"SUCCESS! Exported {len(all_features)} AEW tracks (1979–2023)")
-    print(f"→ {tc_count} of them developed into named Tropical Cyclones")
-    print(f"→ Combined file: {COMBINED_OUTPUT}")
-    if PER_YEAR_OUTPUT:
-        print(f"→ Per-year files in: {OUTPUT_DIR}/")
-    print("\nReady for Leaflet / Folium / Kepler.gl!")
-    print("   • Filter TCs:   feature.properties.developed_into_tc === true")
-    print("   • Show name:    feature.properties.tc_name")
-    print("   • Genesis time: feature.properties.tc_genesis_time")
-    print("="*70)
-else:
-    print("No data processed. Check your input files and paths.")
+    # ------------------------------------------------------------------
+    if n_tracks:
+        print("\n" + "="*70)
+        print(f"SUCCESS! Exported {n_tracks} AEW tracks (1979–2023)")
+        print(f"→ {tc_count} of them developed into named Tropical Cyclones")
+        print(f"→ Combined file: {COMBINED_OUTPUT}")
+        if GZIP_COMBINED:
+            print(f"→ Gzipped copy:  {COMBINED_GZ_OUTPUT}")
+        if PER_YEAR_OUTPUT:
+            print(f"→ Per-year files in: {OUTPUT_DIR}/")
+        if PARQUET_OUTPUT:
+            print(f"→ Parquet points:  {PARQUET_DIR}/ (rebuild with parquet_to_geojson.py)")
+        print("\nReady for Leaflet / Folium / Kepler.gl!")
+        print("   • Filter TCs:   feature.properties.developed_into_tc === true")
+        print("   • Show name:    feature.properties.tc_name")
+        print("   • Genesis time: feature.properties.tc_genesis_time")
+        print("="*70)
+    else:
+        print("No data processed. Check your input files and paths.")
+
+
+if __name__ == "__main__":
+    main()
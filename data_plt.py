@@ -16,12 +16,13 @@ os.makedirs('figures', exist_ok=True)
 
 # Load and clean data
 ds = xr.open_dataset('data/AEW_tracks_post_processed_year_1995.nc')
-if ds.time.to_index().duplicated().any():
-    _, idx = np.unique(ds.time.values, return_index=True)
-    ds = ds.isel(time=idx).sortby('time')
+_, idx = np.unique(ds.time.values, return_index=True)
+if len(idx) != ds.sizes['time']:
+    ds = ds.isel(time=idx)  # indices follow sorted time order already
 
-time_pd = pd.to_datetime(ds.time.values)
-ds = ds.assign_coords(month=('time', time_pd.month))
+# Months straight from datetime64, without building a pandas DatetimeIndex
+months = ds.time.values.astype('datetime64[M]').astype(int) % 12 + 1
+ds = ds.assign_coords(month=('time', months))
 
 lon = ds.AEW_lon_smooth
 lat = ds.AEW_lat_smooth
@@ -30,17 +31,21 @@ strength = ds.AEW_strength
 vmin = float(strength.min().values)
 vmax = float(strength.max().values)
 cmap = plt.cm.plasma_r
+norm = plt.Normalize(vmin, vmax)
 
-# ==============================================================
-def plot_with_proper_title(month_num=None):
-    if month_num is not None:
-        month_name = pd.to_datetime(f'1995-{month_num}-01').strftime('%B')
-        time_str = rf"\textbf{{Time}}: {month_name} 1995"
-        mask = ds.month == month_num
-    else:
-        time_str = "Time: June–October 1995 (Full Season)"
-        mask = slice(None)
+# Plain (system, time) arrays, sliced per month without xarray indexing.
+# float32 is ample for plotting and halves the memory the masks scan over.
+lon_np = lon.transpose('system', 'time').to_numpy().astype(np.float32, copy=False)
+lat_np = lat.transpose('system', 'time').to_numpy().astype(np.float32, copy=False)
+str_np = strength.transpose('system', 'time').to_numpy().astype(np.float32, copy=False)
+months_np = ds.month.values
+
+# Year-wide validity mask, computed once and narrowed per month
+valid_mat = ~(np.isnan(lon_np) | np.isnan(lat_np) | np.isnan(str_np))
 
+# ==============================================================
+def build_base():
+    """Draw the static map (features, title, colorbar, gridlines) once."""
     fig = plt.figure(figsize=(20, 14))
     ax = fig.add_subplot(1, 1, 1, projection=ccrs.PlateCarree())
 
@@ -52,57 +57,81 @@ def plot_with_proper_title(month_num=None):
     ax.add_feature(cfeature.BORDERS, linestyle=':', alpha=0.6)
     ax.set_extent([-120, 60, -20, 60], crs=ccrs.PlateCarree())
 
-    n_tracks = 0
-    for sys in ds.system.values:
-        x = lon.sel(system=sys).where(mask, drop=False).values
-        y = lat.sel(system=sys).where(mask, drop=False).values
-        s = strength.sel(system=sys).where(mask, drop=False).values
+    # --- Proper figure-level title and subtitles ---
+    fig.suptitle('African Easterly Wave Tracks', fontsize=24, fontweight='bold', y=0.75, x=.26)
+
+    time_text = fig.text(0.125, 0.705, '', fontsize=15)
+
+    # --- Colorbar (shared norm/cmap, so it is identical for every month) ---
+    sm = plt.cm.ScalarMappable(norm=norm, cmap=cmap)
+    cbar = fig.colorbar(sm, ax=ax, shrink=0.5, pad=0.02, aspect=25, alpha=0.92)
+    cbar.set_label('AEW Strength', fontsize=13, fontweight='bold')
+
+    # --- Gridlines (kept above the tracks that are added later) ---
+    gl = ax.gridlines(draw_labels=True, alpha=0.5, linestyle='--')
+    gl.top_labels = gl.right_labels = False
+    gl.set_zorder(2.1)
+
+    return fig, ax, time_text
 
-        valid = ~(np.isnan(x) | np.isnan(y) | np.isnan(s))
-        if not valid.any():
+
+def render_month(fig, ax, time_text, month_num=None):
+    """Swap the previous month's tracks and time label, then save."""
+    if month_num is not None:
+        month_name = pd.to_datetime(f'1995-{month_num}-01').strftime('%B')
+        time_str = rf"\textbf{{Time}}: {month_name} 1995"
+        month_valid = valid_mat & (months_np == month_num)
+    else:
+        time_str = "Time: June–October 1995 (Full Season)"
+        month_valid = valid_mat
+
+    # Only remove our own tracks; Cartopy features are collections too
+    for c in [c for c in ax.collections if c.get_gid() == 'aew_track']:
+        c.remove()
+
+    n_tracks = 0
+    all_segments = []
+    all_colors = []
+    for i in range(len(ds.system)):
+        idx = np.flatnonzero(month_valid[i])
+        if not idx.size:
             continue
 
-        x, y, s = x[valid], y[valid], s[valid]
+        x, y, s = lon_np[i, idx], lat_np[i, idx], str_np[i, idx]
         n_tracks += 1
 
-        points = np.array([x, y]).T.reshape(-1, 1, 2)
-        segments = np.concatenate([points[:-1], points[1:]], axis=1)
-        lc = LineCollection(segments, cmap=cmap, norm=plt.Normalize(vmin, vmax),
+        points = np.column_stack([x, y])
+        all_segments.append(np.stack([points[:-1], points[1:]], axis=1))
+        all_colors.append(s[:-1])
+
+    # One collection for every track: a single draw call instead of one per system
+    if all_segments:
+        lc = LineCollection(np.concatenate(all_segments), cmap=cmap, norm=norm,
                             linewidth=2.4, alpha=0.92, transform=ccrs.PlateCarree())
-        lc.set_array(s[:-1])
+        lc.set_array(np.concatenate(all_colors))
+        lc.set_gid('aew_track')
         ax.add_collection(lc)
 
-    # --- Proper figure-level title and subtitles ---
-    fig.suptitle('African Easterly Wave Tracks', fontsize=24, fontweight='bold', y=0.75, x=.26)
-
-    plt.figtext(0.125, 0.705, time_str, fontsize=15)
+    time_text.set_text(time_str)
     #plt.figtext(0.5, 0.85, f"Count: {n_tracks} tracks",
     #            ha='center', fontsize=16, style='italic')
 
-    # --- Colorbar ---
-    cbar = plt.colorbar(lc, ax=ax, shrink=0.5, pad=0.02, aspect=25)
-    cbar.set_label('AEW Strength', fontsize=13, fontweight='bold')
-
-    # --- Gridlines ---
-    gl = ax.gridlines(draw_labels=True, alpha=0.5, linestyle='--')
-    gl.top_labels = gl.right_labels = False
-
     # --- Save ---
     if month_num is not None:
-        name = pd.to_datetime(f'1995-{month_num}-01').strftime('%B')
-        outfile = f'figures/AEW_tracks_strength_{name}_1995.png'
+        outfile = f'figures/AEW_tracks_strength_{month_name}_1995.png'
     else:
         outfile = 'figures/AEW_tracks_strength_FullSeason_1995.png'
 
-    plt.savefig(outfile, dpi=300, bbox_inches='tight')
-    plt.close()
+    fig.savefig(outfile, dpi=300, bbox_inches='tight')
     print(f"Saved → {outfile}")
 
 # ==============================================================
 print("Creating all plots with perfect title placement...\n")
+fig, ax, time_text = build_base()
 for m in [6, 7, 8, 9, 10]:
-    plot_with_proper_title(m)
+    render_month(fig, ax, time_text, m)
 
-plot_with_proper_title(month_num=None)  # full season
+render_month(fig, ax, time_text, month_num=None)  # full season
+plt.close(fig)
 
-print("\nDone! All 6 figures saved with clean, visible titles.")
\ No newline at end of file
+print("\nDone! All 6 figures saved with clean, visible titles.")
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+parquet_to_geojson.py
+Rebuild the combined AEW GeoJSON from the Parquet point table.
+
+data_json.py writes one row per valid track point to output/parquet/year=YYYY/.
+Property-only changes can be re-exported from there in a few seconds, without
+decoding any NetCDF files. Output matches data_json.py's combined file.
+"""
+
+import glob
+import gzip
+import os
+import numpy as np
+import polars as pl
+
+from data_json import (
+    COMBINED_GZ_OUTPUT, COMBINED_NAME, COMBINED_OUTPUT, GZIP_COMBINED, PARQUET_DIR,
+    Feature, FeatureCollection, LineString, PointData, Properties, encoder,
+)
+
+
+def build_features():
+    # One row per track: point columns collected into lists (row order within
+    # each group is the time order written by data_json.py)
+    tracks = (
+        pl.scan_parquet(f"{PARQUET_DIR}/**/*.parquet", hive_partitioning=True)
+        .group_by(["year", "sys_id"], maintain_order=True)
+        .agg(
+            pl.col("lon"), pl.col("lat"), pl.col("strength"),
+            pl.col("month"), pl.col("time"),
+            pl.col("tc_name").first(), pl.col("tc_gen_time").first(),
+        )
+        .sort(["year", "sys_id"])
+        .collect()
+    )
+
+    features = []
+    for row in tracks.iter_rows(named=True):
+        s = np.asarray(row["strength"])
+        coordinates = np.stack([row["lon"], row["lat"]], axis=1).tolist()
+        point_data = [
+            PointData(val, mo, tm)
+            for val, mo, tm in zip(row["strength"], row["month"], row["time"])
+        ]
+        features.append(Feature(
+            geometry=LineString(coordinates=coordinates),
+            properties=Properties(
+                system_id=row["sys_id"],
+                year=row["year"],
+                track_length_points=len(coordinates),
+                months=np.unique(row["month"]).tolist(),
+                strength_min=float(s.min()),
+                strength_max=float(s.max()),
+                strength_mean=float(s.mean()),
+                point_data=point_data,
+                developed_into_tc=row["tc_gen_time"] is not None,
+                tc_name=row["tc_name"],
+                tc_genesis_time=row["tc_gen_time"],
+            ),
+        ))
+    return features
+
+
+def main():
+    # scan_parquet raises on an empty glob, so check for partitions first
+    if not glob.glob(f"{PARQUET_DIR}/**/*.parquet", recursive=True):
+        print(f"No Parquet data found in {PARQUET_DIR}/ — run data_json.py first.")
+        return
+
+    features = build_features()
+
+    # Write to temp files and promote them, as data_json.py does, so a crash
+    # mid-write never replaces a good combined file with a truncated one
+    data = encoder.encode(FeatureCollection(name=COMBINED_NAME, features=features))
+    tmp_output = f"{COMBINED_OUTPUT}.tmp"
+    tmp_gz_output = f"{COMBINED_GZ_OUTPUT}.tmp"
+    try:
+        with open(tmp_output, "wb") as f:
+            f.write(data)
+        if GZIP_COMBINED:
+            with gzip.open(tmp_gz_output, "wb", compresslevel=6) as f:
+                f.write(data)
+
+        os.replace(tmp_output, COMBINED_OUTPUT)
+        if GZIP_COMBINED:
+            os.replace(tmp_gz_output, COMBINED_GZ_OUTPUT)
+    finally:
+        for tmp_file in (tmp_output, tmp_gz_output):
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+
+    tc_count = sum(1 for f in features if f.properties.developed_into_tc)
+    print(f"Rebuilt {len(features)} AEW tracks ({tc_count} TCs) → {COMBINED_OUTPUT}")
+
+
+if __name__ == "__main__":
+    main()